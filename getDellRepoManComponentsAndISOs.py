@@ -13,7 +13,6 @@
 # accept the terms of the Dell Software License Agreement:
 # https://www.dell.com/learn/us/en/uscorp1/terms-of-sale-consumer-license-agreements
 
-#TODO: Threaded downloads
 #TODO: Add PSBI
 
 """
@@ -35,22 +34,31 @@ EXAMPLE:
     python getDellRepoManComponentsAndISOs.py -wb drminstaller-windows suu-windows plugins -pa 192.168.268.254:3128
 """
 import argparse
+import atexit
 import getpass
+import gzip
 import logging
 import logging.handlers
+import mmap
 import os
+import queue
+import random
 import requests
+import struct
 import sys
 import tarfile
+import threading
 import warnings
 import traceback
-from copy import copy
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from email.utils import parsedate_to_datetime
 from enum import Enum
 from io import BytesIO
-from json import loads
-from time import sleep
+from json import dumps, loads
+from time import monotonic, sleep, time
+from urllib.parse import urlparse
 from bs4 import BeautifulSoup
-from lxml import html
+from lxml import etree, html
 
 # import agentheaders
 
@@ -155,7 +163,8 @@ whichbits = {'displayOnly': 'The default choice if the argument is not passed.\n
              'drminstaller-windows': 'Display or download the current DRM Installer for Windows.',
              'plugins': 'Display or download DRM plugins only.',
              'suu-linux': 'Display or download the SUU for Linux inband firmware updates',
-             'suu-windows': 'Display or download the SUU for Windows inband and oob firmware updates'}
+             'suu-windows': 'Display or download the SUU for Windows inband and oob firmware updates',
+             'catalog-dups': 'Display or download individual DUPs from the Dell enterprise catalog matching -sm, -os and -ct.\nRequires -sm.'}
 
 
 #class Error(Exception):
@@ -181,6 +190,245 @@ class DownloadFailedWithoutStatusCode(requests.RequestException):
         return self.message
 
 
+class DownloadSourcesExhausted(requests.RequestException):
+    """
+    We will Raise this when every attempt against every mirror for a URL has failed.
+
+    Attribute:
+      message - the message passed or the default message
+    """
+
+    def __init__(self, message="All URL sources failed."):
+        self.message = message
+        super().__init__(self.message)
+
+    def __str__(self):
+        return self.message
+
+    def __repr__(self):
+        return self.message
+
+
+class DownloadCancelled(Exception):
+    """
+    We will Raise this in worker threads when the user cancels downloads from the main thread.
+
+    Attribute:
+      message - the message passed or the default message
+    """
+
+    def __init__(self, message="Download cancelled by user."):
+        self.message = message
+        super().__init__(self.message)
+
+    def __str__(self):
+        return self.message
+
+    def __repr__(self):
+        return self.message
+
+
+class IsoFormatError(ValueError):
+    """
+    We will Raise this when an ISO image does not parse as ISO9660.
+
+    Attribute:
+      message - the message passed or the default message
+    """
+
+    def __init__(self, message="Image is not a valid ISO9660 image."):
+        self.message = message
+        super().__init__(self.message)
+
+    def __str__(self):
+        return self.message
+
+    def __repr__(self):
+        return self.message
+
+
+class RetryPolicy():
+    """
+    Retry timings for downloads.
+
+    Exponential backoff with full jitter between attempts. A Retry-After
+    header from the server replaces the backoff, capped at maxDelay.
+    """
+
+    def __init__(self, attempts=5, backoff=1.0, maxDelay=60.0):
+        """__init__ of attempt count and backoff timings in seconds."""
+        self.name = 'retryPolicy'
+        self.attempts = max(1, attempts)
+        self.backoff = backoff
+        self.maxDelay = maxDelay
+
+    def delay(self, attempt, retryAfter=None):
+        """Seconds to wait after failed attempt number attempt (0 based)."""
+        if retryAfter is not None:
+            return min(retryAfter, self.maxDelay)
+        return random.uniform(0, min(self.maxDelay, self.backoff * 2 ** attempt))
+
+    @staticmethod
+    def parseRetryAfter(value):
+        """Parse a Retry-After header given as either delta seconds or an HTTP date. Returns seconds or None."""
+        if not value:
+            return None
+        try:
+            return max(0.0, float(value))
+        except ValueError:
+            pass
+        try:
+            return max(0.0, parsedate_to_datetime(value).timestamp() - time())
+        except (TypeError, ValueError, IndexError):
+            return None
+
+
+class MirrorCircuitBreaker():
+    """
+    Per mirror circuit breaker.
+
+    A mirror opens after threshold consecutive failures and is passed over
+    until cooldown seconds have gone by, after which it is half open. The
+    first caller to claim() it gets the single trial request, everyone else
+    keeps passing it over until that trial succeeds (closed), fails (open
+    for another cooldown) or is abandoned (half open again).
+    """
+
+    def __init__(self, threshold=3, cooldown=300.0, kind='mirror'):
+        """__init__ of failure threshold, cooldown in seconds and what is being broken for log messages."""
+        self.name = 'mirrorCircuitBreaker'
+        self.threshold = max(1, threshold)
+        self.cooldown = cooldown
+        self.kind = kind
+        self.mirrors = {}
+        self.lock = threading.Lock()
+
+    def allow(self, mirror):
+        """Return True if mirror is closed, or half open with no trial request in flight."""
+        m = self.mirrors.get(mirror)
+        if not m or m['failures'] < self.threshold:
+            return True
+        return not m['trial'] and monotonic() - m['openedAt'] >= self.cooldown
+
+    def claim(self, mirror):
+        """Like allow(), but takes the trial request if mirror is half open. Use for the request about to be made."""
+        with self.lock:
+            if not self.allow(mirror):
+                return False
+            m = self.mirrors.get(mirror)
+            if m and m['failures'] >= self.threshold:
+                m['trial'] = True
+                logit.info('Circuit half open for %s %s, sending a trial request.', self.kind, mirror)
+            return True
+
+    def abandon(self, mirror):
+        """Hand back a trial request that ended without saying anything about the mirror's health."""
+        with self.lock:
+            m = self.mirrors.get(mirror)
+            if m:
+                m['trial'] = False
+
+    def success(self, mirror):
+        """Close mirror after a successful request."""
+        with self.lock:
+            closed = self.mirrors.pop(mirror, None)
+        if closed:
+            logit.info('Circuit closed for %s %s.', self.kind, mirror)
+
+    def failure(self, mirror):
+        """Count a failure against mirror and (re)open it once threshold is reached."""
+        with self.lock:
+            m = self.mirrors.setdefault(mirror, {'failures': 0, 'openedAt': 0, 'trial': False})
+            m['failures'] += 1
+            m['trial'] = False
+            failures = m['failures']
+            if failures >= self.threshold:
+                m['openedAt'] = monotonic()
+        if failures >= self.threshold:
+            logit.warning('Circuit open for %s %s after %s consecutive failures. Avoiding it for %s seconds.', self.kind, mirror, failures, self.cooldown)
+
+    def pick(self, candidates, attempt=0):
+        """Pick the URL to try for attempt, rotating through candidates and passing over open mirrors."""
+        rotated = candidates[attempt % len(candidates):] + candidates[:attempt % len(candidates)]
+        for c in rotated:
+            if self.claim(urlparse(c).netloc):
+                return c
+        # every mirror is open, try anyway rather than fail without asking
+        return rotated[0]
+
+
+class ProxyPool():
+    """
+    Spread transfers across one or more egress proxies, each with its own session.
+
+    New transfers go to the proxy expected to clear its queue soonest, i.e.
+    outstanding bytes over measured throughput. Proxies with no measurement
+    yet are assumed as fast as the best one so they get tried. A proxy that
+    keeps failing is pulled from rotation by its circuit breaker until the
+    cooldown has passed. With no proxies the pool holds one direct session.
+
+    Throughput is bytes over the wall clock time a proxy had at least one
+    transfer active, so concurrent transfers through one proxy add up rather
+    than averaging out.
+    """
+
+    def __init__(self, breaker):
+        """__init__ of the circuit breaker used to pull failing proxies."""
+        self.name = 'proxyPool'
+        self.breaker = breaker
+        self.proxies = []
+        self.lock = threading.Lock()
+
+    def add(self, proxy, session):
+        """Add a proxy address (None for direct) and its session to the pool."""
+        self.proxies.append({'proxy': proxy, 'session': session, 'active': 0, 'outstanding': 0, 'bytes': 0, 'busySeconds': 0.0, 'busySince': None})
+
+    @staticmethod
+    def label(entry):
+        """Printable name for a pool entry."""
+        return entry['proxy'] or 'direct internet connection'
+
+    @staticmethod
+    def throughput(entry):
+        """Measured bytes per second of busy time through entry, or None if nothing has completed yet."""
+        busy = entry['busySeconds'] + (monotonic() - entry['busySince'] if entry['active'] else 0)
+        return entry['bytes'] / busy if entry['bytes'] and busy > 0 else None
+
+    def acquire(self):
+        """Pick the entry for a new transfer and count it as active."""
+        with self.lock:
+            candidates = [p for p in self.proxies if self.breaker.allow(p['proxy'])] or self.proxies
+            measured = [self.throughput(p) for p in candidates if self.throughput(p)]
+            assumed = max(measured) if measured else 1.0
+            entry = min(candidates, key=lambda p: ((p['outstanding'] + 1) / (self.throughput(p) or assumed), p['active']))
+            # holding the pool lock, so no other acquire can slip in between allow() and claim()
+            self.breaker.claim(entry['proxy'])
+            if entry['active'] == 0:
+                entry['busySince'] = monotonic()
+            entry['active'] += 1
+            return entry
+
+    def expect(self, entry, expectedLength):
+        """Add the size of a transfer to entry's outstanding bytes once its headers are in."""
+        with self.lock:
+            entry['outstanding'] += expectedLength
+
+    def release(self, entry, expectedLength=0, receivedLength=0, failed=False, cancelled=False):
+        """Finish a transfer on entry, updating its throughput and circuit breaker. A cancelled transfer gives no health verdict."""
+        with self.lock:
+            entry['active'] -= 1
+            entry['outstanding'] -= expectedLength
+            entry['bytes'] += receivedLength
+            if entry['active'] == 0:
+                entry['busySeconds'] += monotonic() - entry['busySince']
+        if cancelled:
+            self.breaker.abandon(entry['proxy'])
+        elif failed:
+            self.breaker.failure(entry['proxy'])
+        elif entry['proxy']:
+            self.breaker.success(entry['proxy'])
+
+
 class RawAndDefaultsFormatter(argparse.ArgumentDefaultsHelpFormatter,
                               argparse.RawDescriptionHelpFormatter):
     """
@@ -202,6 +450,12 @@ arggrp_logging.add_argument(
 arggrp_logging.add_argument("-l", "--logfile", help='''Log output to file, in same directory as script. Logging will rotate every 1mb of logging unless deleted. Logging level will be based on -v argument.''', action="store_true", dest='l')
 
 arggrp_downloads = parser.add_argument_group('Component Download Options')
+arggrp_downloads.add_argument("-ra", "--retryAttempts", default=5, type=int, action='store', help='''Maximum attempts per file across all mirrors.''', dest='ra')
+arggrp_downloads.add_argument("-rb", "--retryBackoff", default=1.0, type=float, action='store', help='''Base backoff in seconds. Doubles each attempt with random jitter applied.''', dest='rb')
+arggrp_downloads.add_argument("-rx", "--retryMaxDelay", default=60.0, type=float, action='store', help='''Maximum wait in seconds between attempts, including any Retry-After sent by the server.''', dest='rx')
+arggrp_downloads.add_argument("-cb", "--circuitBreakerThreshold", default=3, type=int, action='store', help='''Consecutive failures after which a mirror is avoided in favour of the alternate mirror.''', dest='cb')
+arggrp_downloads.add_argument("-cc", "--circuitBreakerCooldown", default=300.0, type=float, action='store', help='''Seconds a failing mirror is avoided before it is tried again.''', dest='cc')
+arggrp_downloads.add_argument("-dt", "--downloadThreads", default=None, type=int, action='store', help='''Number of files downloaded at once. Defaults to one per -pa proxy, or 1 with no proxy.''', dest='dt')
 arggrp_downloads.add_argument("-dp", "--downloadToPath", default="{}".format(os.path.dirname(os.path.abspath(__file__))), action='store',
                               help='''If unset or used but no path specified, saves will default to this script launch directory. Ignored if -wb argument contains display-Only option.''', dest='dp')
 # whichBits to tie in with whichbits list below ion help and set above for actual items
@@ -214,9 +468,25 @@ for k in whichbits:
 #TODO: Add secure password option from CLI for automated use via Proxy.
 arggrp_proxy = parser.add_argument_group(
     'Proxy Details - note for security, password is promtped for during running. Not an parameter option prior to launch.')
-arggrp_proxy.add_argument("-pa", "--proxyaddress", default=None, help='''Specify Proxy Address inc port if not port 80 or 443, e.g. myproxy.dom.local:8080 or 192.168.234.254''', action="store",  dest='pa')
-arggrp_proxy.add_argument("-pu", "--proxyusername", help='Enter Proxy Username', action="store", dest='pu')
+arggrp_proxy.add_argument("-pa", "--proxyaddress", default=None, nargs='+', metavar='PA', help='''Specify Proxy Address inc port if not port 80 or 443, e.g. myproxy.dom.local:8080 or 192.168.234.254. Supplied as a space separated list, transfers are spread across all of them and a failing proxy is taken out of rotation.''', action="store",  dest='pa')
+arggrp_proxy.add_argument("-pu", "--proxyusername", nargs='+', metavar='PU', help='Enter Proxy Username. Either one username for every proxy or one per -pa proxy in the same order. Password is prompted for each proxy.', action="store", dest='pu')
+# enterprise catalog DUP filters
+arggrp_catalog = parser.add_argument_group('Dell Catalog DUP Filter Options - used by -wb catalog-dups')
+arggrp_catalog.add_argument("-sm", "--systemModel", default=None, nargs='+', metavar='MODEL', help='''System IDs (e.g. 08FF) or model names (e.g. R740) to match. Required with -wb catalog-dups.''', action="store", dest='sm')
+arggrp_catalog.add_argument("-os", "--osCode", default=None, nargs='+', metavar='OSCODE', help='''Catalog OS codes to match, e.g. LIN64 WIN64. Default matches any OS.''', action="store", dest='os')
+arggrp_catalog.add_argument("-ct", "--componentType", default=None, nargs='+', metavar='TYPE', help='''Catalog component types to match, e.g. BIOS FRMW DRVR APAC. Default matches any type.''', action="store", dest='ct')
+# iso indexing
+arggrp_iso = parser.add_argument_group('ISO Index Options - ISOs are indexed automatically after download')
+arggrp_iso.add_argument("-ix", "--indexISO", default=None, nargs='+', metavar='ISO', help='''Index already downloaded ISOs and exit. Writes <iso>.index.json listing each contained file with its size and offset, and extracts the embedded repository catalog next to the ISO. No mounting or root required.''', action="store", dest='ix')
+# metrics output
+arggrp_metrics = parser.add_argument_group('Run Metrics Output Options')
+arggrp_metrics.add_argument("-mf", "--metricsFile", default=None, help='''Write run metrics to this file in Prometheus text exposition format, e.g. into the node_exporter textfile collector directory as drmisos.prom. A JSON summary is written alongside with a .json extension. Both are replaced atomically at the end of each run.''', action="store", dest='mf')
 args = parser.parse_args()
+if args.pu and len(args.pu) not in (1, len(args.pa or [])):
+    parser.error('-pu takes either one username or one per -pa proxy')
+if 'catalog-dups' in args.wb and not args.sm:
+    # without a model filter this would pull every DUP Dell publishes
+    parser.error('-wb catalog-dups requires -sm/--systemModel')
 
 
 class LogitLevelColours():
@@ -281,15 +551,53 @@ class LogitFormatting(logging.Formatter):
         """__init__ to setup this class with the inherited class."""
         logging.Formatter.__init__(self, recordMsg)
 
+    c_levelnames = {}
+
     def format(self, record):
         """Format the record detail to output."""
-        c_record = copy(record)
-        levelname = c_record.levelname
-        # message = c_record.msg
-        levelColour = LogitLevelColours.__dict__[levelname]
-        c_levelname = ('{}{:^10}{}').format(levelColour, levelname, TxtFormat.style.reset)
-        c_record.levelname = c_levelname
-        return logging.Formatter.format(self, c_record)
+        # swap the colour levelname in and back out rather than copy every record.
+        # Safe as the queue listener formats one record at a time.
+        levelname = record.levelname
+        c_levelname = self.c_levelnames.get(levelname)
+        if c_levelname is None:
+            levelColour = LogitLevelColours.__dict__[levelname]
+            c_levelname = self.c_levelnames[levelname] = ('{}{:^10}{}').format(levelColour, levelname, TxtFormat.style.reset)
+        record.levelname = c_levelname
+        try:
+            return logging.Formatter.format(self, record)
+        finally:
+            record.levelname = levelname
+
+
+class LogSummary():
+    """
+    Lazy summary of a log argument.
+
+    Pass large payloads (catalogs, component sets, downloaded bytes) wrapped in
+    this instead of the object itself. Nothing is built unless the record is
+    actually emitted, and then only a bounded summary rather than the full
+    serialisation.
+    """
+
+    def __init__(self, obj, limit=200):
+        """__init__ of the object to summarise and the max length of the summary."""
+        self.obj = obj
+        self.limit = limit
+
+    def __str__(self):
+        """Build the summary."""
+        o = self.obj
+        if isinstance(o, (bytes, bytearray)):
+            return '<{} bytes>'.format(len(o))
+        if isinstance(o, dict):
+            keys = list(o)
+            return '<dict of {} keys: {}{}>'.format(len(keys), ', '.join(str(k) for k in keys[:10]), ', ...' if len(keys) > 10 else '')
+        if isinstance(o, (list, tuple)) and len(o) > 10:
+            return '<{} of {} items>'.format(type(o).__name__, len(o))
+        s = str(o)
+        if len(s) > self.limit:
+            return '{}... ({} chars)'.format(s[:self.limit], len(s))
+        return s
 
 
 warnings.filterwarnings("ignore")
@@ -302,6 +610,10 @@ def success(self, message, *args, **kwargs):
     """Success Custom Log Level Implementer"""
 
     if self.isEnabledFor(logging.SUCCESS):
+        # Before 3.11 findCaller already steps back past this function to its caller.
+        # 3.11 changed that, so it needs stacklevel to report the caller rather than this function.
+        if sys.version_info >= (3, 11):
+            kwargs.setdefault('stacklevel', 2)
         self._log(logging.SUCCESS, message, args, **kwargs)
 
 logging.Logger.success = success
@@ -313,6 +625,8 @@ def enforced(self, message, *args, **kwargs):
     """Enforced ustom Log Level Implementer"""
 
     if self.isEnabledFor(logging.ENFORCED):
+        if sys.version_info >= (3, 11):
+            kwargs.setdefault('stacklevel', 2)
         self._log(logging.ENFORCED, message, args, **kwargs)
 
 logging.Logger.enforced = enforced
@@ -334,19 +648,29 @@ if args.v == 0:
     logit.setLevel(logging.WARNING)
 
 csh = logging.StreamHandler()
-cshLF = LogitFormatting('[%(asctime)s][%(levelname)s][Line:%(lineno)d] %(message)s')
+cshLF = LogitFormatting('[%(asctime)s][%(levelname)s][Line:%(lineno)d][%(funcName)s] %(message)s')
 csh.setFormatter(cshLF)
-logit.addHandler(csh)
+logitHandlers = [csh]
 
 if args.l:  # only create file & handler if -l is specified and logit level is > notset or 0
-    logit.debug("Log file requested. Setting up....")
     logitFileName = os.path.splitext(os.path.abspath(__file__))[0]+'.log'
-    logit.debug("Log file path: {}".format(logitFileName))
     rfh = logging.handlers.RotatingFileHandler(
         logitFileName, maxBytes=1048576, backupCount=20)
-    rfhLF = logging.Formatter('%(asctime)s|%(levelname)s|Line:%(lineno)d|%(message)s')
+    rfhLF = logging.Formatter('%(asctime)s|%(levelname)s|Line:%(lineno)d|%(funcName)s|%(message)s')
     rfh.setFormatter(rfhLF)
-    logit.addHandler(rfh)
+    logitHandlers.append(rfh)
+
+# console and file handlers run on a background thread fed from a queue so
+# callers never wait on terminal or disk writes. Stopped at exit to flush.
+logitQueue = queue.SimpleQueue()
+logitListener = logging.handlers.QueueListener(logitQueue, *logitHandlers, respect_handler_level=True)
+logit.addHandler(logging.handlers.QueueHandler(logitQueue))
+logitListener.start()
+atexit.register(logitListener.stop)
+
+if args.l:
+    logit.debug("Log file requested.")
+    logit.debug("Log file path: %s", logitFileName)
     # with OverrideLoggingLevel(logit, level=logging.ENFORCED):
     logit.enforced("****** New Execution Run Started ******")
 
@@ -354,9 +678,243 @@ if args.v == 0:
     ln = logging.getLevelName(logit.getEffectiveLevel()).lower()
     lnColour = LogitLevelColours.__dict__[ln.upper()]
     # with LoggingContext(logit, level=logging.ENFORCED): #temp override logging conext for one message only.
-    logit.enforced("Logging level not set at CLI. Defaulting to {} level output. ENFORCED messages will always be shown.".format(ln.upper()))
+    logit.enforced("Logging level not set at CLI. Defaulting to %s level output. ENFORCED messages will always be shown.", ln.upper())
+
+
+# set from the main thread to stop worker thread downloads on user cancellation
+downloadCancelled = threading.Event()
 
 
+class RunMetrics():
+    """
+    Collect run metrics for the Prometheus textfile collector and a JSON summary.
+
+    Covers bytes, throughput and time to first byte per artifact, retries and
+    fallbacks per mirror, failures per proxy, discovery durations, fetched/skipped/failed counts
+    and last success timestamps. Last success timestamps are carried over from
+    the previous JSON summary so a failed run does not reset them. The run
+    itself is only stamped as a success once recordCompleted() has been called
+    and nothing failed.
+
+    Catalogs and scrape pages fetched during discovery are recorded with kind
+    discovery and kept out of the fetched/skipped artifact counts.
+    """
+
+    def __init__(self):
+        """__init__ of the run counters."""
+        self.name = 'runMetrics'
+        self.runStarted = time()
+        self.artifacts = {}
+        self.mirrors = {}
+        self.proxies = {}
+        self.discovery = {}
+        self.fetched = 0
+        self.skipped = 0
+        self.failed = 0
+        self.failedArtifacts = []
+        self.completed = False
+        self.lastSuccess = {}
+        # every artifact this run asked for, whatever the outcome
+        self.requested = set()
+        # downloads record from worker threads
+        self.lock = threading.Lock()
+
+    def mirror(self, url):
+        """Return the counters for the mirror (host) serving url, creating them if required."""
+        host = urlparse(url).netloc or url
+        return self.mirrors.setdefault(host, {'retries': 0, 'fallbacks': 0})
+
+    def recordRetry(self, url):
+        """Count a failed attempt against the mirror serving url."""
+        with self.lock:
+            self.mirror(url)['retries'] += 1
+
+    def recordFallback(self, url):
+        """Count a switch away from the mirror serving url."""
+        with self.lock:
+            self.mirror(url)['fallbacks'] += 1
+
+    def recordProxyFailure(self, proxy):
+        """Count a failed attempt against the proxy it went through."""
+        with self.lock:
+            self.proxies[proxy] = self.proxies.get(proxy, 0) + 1
+
+    def recordFetched(self, artifact, url, receivedBytes, seconds, ttfb, kind='file'):
+        """Record a completed transfer and stamp its last success time. kind is file or discovery."""
+        with self.lock:
+            if kind == 'file':
+                self.fetched += 1
+            finished = time()
+            self.artifacts[artifact] = {'url': url,
+                                        'kind': kind,
+                                        'started_timestamp_seconds': finished - seconds,
+                                        'finished_timestamp_seconds': finished,
+                                        'bytes': receivedBytes,
+                                        'seconds': seconds,
+                                        'ttfb_seconds': ttfb,
+                                        'throughput_bytes_per_second': receivedBytes / seconds if seconds > 0 else 0}
+            self.lastSuccess[artifact] = finished
+            self.requested.add(artifact)
+
+    def recordSkipped(self, artifact):
+        """Record an artifact skipped because it already exists in the target directory."""
+        with self.lock:
+            self.skipped += 1
+            self.requested.add(artifact)
+
+    def recordFailed(self, artifact):
+        """Record an artifact, or a required discovery source, where every source failed."""
+        with self.lock:
+            self.failed += 1
+            self.failedArtifacts.append(artifact)
+            self.requested.add(artifact)
+
+    def recordCompleted(self):
+        """Mark the run as having reached its normal end."""
+        self.completed = True
+
+    def succeeded(self):
+        """True if the run reached its normal end with nothing failed."""
+        return self.completed and self.failed == 0
+
+    def timed(self, stage):
+        """Return a context manager recording the duration of a discovery stage, e.g. catalog or suu."""
+        return _RunMetricsTimer(self, stage)
+
+    def totals(self):
+        """
+        Return aggregate bytes, transfer seconds and throughput across all fetched artifacts.
+
+        Transfer seconds is the wall clock time at least one transfer was
+        running, i.e. the union of the transfer intervals. Concurrent transfers
+        therefore add to the aggregate throughput, and idle gaps such as the
+        pre-download pause do not dilute it.
+        """
+        totalBytes = sum(a['bytes'] for a in self.artifacts.values())
+        totalSeconds = 0.0
+        busyUntil = None
+        for start, end in sorted((a['started_timestamp_seconds'], a['finished_timestamp_seconds']) for a in self.artifacts.values()):
+            if busyUntil is None or start > busyUntil:
+                totalSeconds += end - start
+                busyUntil = end
+            elif end > busyUntil:
+                totalSeconds += end - busyUntil
+                busyUntil = end
+        return totalBytes, totalSeconds, totalBytes / totalSeconds if totalSeconds > 0 else 0
+
+    def loadPrevious(self, jsonPath):
+        """
+        Carry last success timestamps over from a previous JSON summary, if there is one.
+
+        Only the run itself and artifacts requested in this run are carried
+        over. File names include versions, so carrying everything would grow
+        the label set with every release.
+        """
+        try:
+            with open(jsonPath, 'r') as f:
+                previous = loads(f.read())
+            for k, v in previous.get('last_success_timestamp_seconds', {}).items():
+                if k == 'run' or k in self.requested:
+                    self.lastSuccess.setdefault(k, v)
+        except (IOError, ValueError) as err:
+            logit.debug("No previous metrics summary loaded from %s: %r", jsonPath, err)
+
+    def summary(self):
+        """Build the JSON summary dict for this run."""
+        totalBytes, totalSeconds, totalThroughput = self.totals()
+        return {'run_started_timestamp_seconds': self.runStarted,
+                'run_finished_timestamp_seconds': time(),
+                'downloaded_bytes': totalBytes,
+                'transfer_seconds': totalSeconds,
+                'throughput_bytes_per_second': totalThroughput,
+                'artifacts_fetched': self.fetched,
+                'artifacts_skipped': self.skipped,
+                'artifacts_failed': self.failed,
+                'failed_artifacts': self.failedArtifacts,
+                'run_succeeded': self.succeeded(),
+                'discovery_seconds': self.discovery,
+                'mirrors': self.mirrors,
+                'proxy_failures': self.proxies,
+                'artifacts': self.artifacts,
+                'last_success_timestamp_seconds': self.lastSuccess}
+
+    def exposition(self, summary):
+        """Render the summary in Prometheus text exposition format."""
+        def esc(v):
+            return str(v).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+        lines = []
+
+        def metric(name, helpText, samples):
+            lines.append('# HELP drmisos_{} {}'.format(name, helpText))
+            lines.append('# TYPE drmisos_{} gauge'.format(name))
+            for labels, value in samples:
+                lbl = ','.join('{}="{}"'.format(k, esc(v)) for k, v in labels)
+                lines.append('drmisos_{}{} {}'.format(name, '{'+lbl+'}' if lbl else '', repr(float(value))))
+
+        metric('run_started_timestamp_seconds', 'Unix time the last run started.', [((), summary['run_started_timestamp_seconds'])])
+        metric('run_finished_timestamp_seconds', 'Unix time the last run wrote its metrics.', [((), summary['run_finished_timestamp_seconds'])])
+        metric('run_succeeded', '1 if the last run reached its normal end with nothing failed, otherwise 0.', [((), 1 if summary['run_succeeded'] else 0)])
+        metric('downloaded_bytes', 'Bytes downloaded during the last run.', [((), summary['downloaded_bytes'])])
+        metric('throughput_bytes_per_second', 'Aggregate transfer throughput during the last run, bytes over wall clock time with a transfer running.', [((), summary['throughput_bytes_per_second'])])
+        metric('artifacts', 'Artifacts by outcome during the last run.',
+               [((('outcome', 'fetched'),), self.fetched), ((('outcome', 'skipped'),), self.skipped), ((('outcome', 'failed'),), self.failed)])
+        metric('discovery_seconds', 'Time spent discovering components per stage.',
+               [((('stage', k),), v) for k, v in sorted(self.discovery.items())])
+        metric('mirror_retries', 'Failed attempts per mirror during the last run.',
+               [((('mirror', k),), v['retries']) for k, v in sorted(self.mirrors.items())])
+        metric('mirror_fallbacks', 'Switches away from a mirror during the last run.',
+               [((('mirror', k),), v['fallbacks']) for k, v in sorted(self.mirrors.items())])
+        metric('proxy_failures', 'Failed attempts per egress proxy during the last run.',
+               [((('proxy', k),), v) for k, v in sorted(self.proxies.items())])
+        metric('artifact_bytes', 'Bytes received per artifact.',
+               [((('artifact', k), ('kind', v['kind'])), v['bytes']) for k, v in sorted(self.artifacts.items())])
+        metric('artifact_throughput_bytes_per_second', 'Transfer throughput per artifact.',
+               [((('artifact', k), ('kind', v['kind'])), v['throughput_bytes_per_second']) for k, v in sorted(self.artifacts.items())])
+        metric('artifact_ttfb_seconds', 'Time to first byte per artifact.',
+               [((('artifact', k), ('kind', v['kind'])), v['ttfb_seconds']) for k, v in sorted(self.artifacts.items())])
+        metric('last_success_timestamp_seconds', 'Unix time each artifact, or the whole run, last completed successfully.',
+               [((('artifact', k),), v) for k, v in sorted(self.lastSuccess.items())])
+        return '\n'.join(lines)+'\n'
+
+    def write(self, path):
+        """Atomically write the Prometheus textfile to path and the JSON summary alongside it."""
+        logit.debug("Entering def.")
+        jsonPath = os.path.splitext(path)[0]+'.json'
+        self.loadPrevious(jsonPath)
+        if self.succeeded():
+            self.lastSuccess['run'] = time()
+        summary = self.summary()
+        for p, content in ((jsonPath, dumps(summary, indent=4, sort_keys=True)), (path, self.exposition(summary))):
+            tmpFileName = p+'.tmp'
+            try:
+                with open(tmpFileName, 'w') as f:
+                    f.write(content)
+                os.replace(tmpFileName, p)
+                logit.info("Metrics written to %s", p)
+            except (IOError, OSError) as err:
+                logit.error('Could not write metrics file %s', p)
+                logit.error('%r', err)
+        logit.debug("Exiting def.")
+
+
+class _RunMetricsTimer():
+    """Context manager returned by RunMetrics.timed() to time a discovery stage."""
+
+    def __init__(self, metrics, stage):
+        """__init__ of the owning metrics object and stage name."""
+        self.metrics = metrics
+        self.stage = stage
+
+    def __enter__(self):
+        """__enter__ notes the start time."""
+        self.started = monotonic()
+
+    def __exit__(self, et, ev, tb):
+        """__exit__ records the elapsed time against the stage."""
+        self.metrics.discovery[self.stage] = self.metrics.discovery.get(self.stage, 0) + monotonic() - self.started
+        # implicit return of None => don't swallow exceptions
+
 
 class DictWalkerMode(Enum):
     """
@@ -388,12 +946,12 @@ def dictWalker(d, dwMode=DictWalkerMode, u=None, indent=-4):
     """
     indent += 4
     if indent == 0:
-        logit.debug("Entering: def {}({}, {}, {}, {})".format(str(sys._getframe().f_code.co_name), d, str(dwMode), u, indent))
+        logit.debug("Entering def: (%s, %s, %s, %s)", LogSummary(d), dwMode, LogSummary(u), indent)
     else:
-        logit.debug("Entering: def {}({}, {}, {}, {}): Recursive level {}".format(str(sys._getframe().f_code.co_name), d, str(dwMode), u, indent, indent // 4))
+        logit.debug("Entering def: (%s, %s, %s, %s): Recursive level %s", LogSummary(d), dwMode, LogSummary(u), indent, indent // 4)
 
     if u:
-        logit.debug('Updating variable u with: {}'.format(u))
+        logit.debug('Updating variable u with: %s', LogSummary(u))
         u.update(u)
     else:
         u = {}
@@ -405,53 +963,53 @@ def dictWalker(d, dwMode=DictWalkerMode, u=None, indent=-4):
             dpath.append(k)
             if dwMode.value == 'dictBuild':
                 p = ".".join(dpath)
-                logit.debug("Updating u variable with {}={}".format(p, v))
+                logit.debug("Updating u variable with %s=%s", p, v)
                 u.update({p:v})
             elif dwMode.value == 'display':
-                logit.debug("{}={}".format(".".join(dpath), v))
+                logit.debug("%s=%s", ".".join(dpath), v)
                 print(indent * ' ', "{} {} = {}".format(TxtFormat.symbols.arrow_curved_down_right, k, v))
                 # print(("{}={}".format(".".join(path), v)))
             dpath.pop()
         elif v is None:
             dpath.append(k)
             # nothing to do for this particular script. Will/Should never get called.
-            logit.warning("dictWalker got passed a key with no value information from {}. Depending on the data being walked this might cause issues further in to execution.".format(k))
+            logit.warning("dictWalker got passed a key with no value information from %s. Depending on the data being walked this might cause issues further in to execution.", k)
             dpath.pop()
         elif isinstance(v, list):
             dpath.append(k)
             if dwMode.value == 'dictBuild':
                 for v_int in v:
-                    logit.debug('Recursing into dictWalker passing params; {}, {}, {}, {}'.format(v_int, str(dwMode), u, indent))
+                    logit.debug('Recursing into dictWalker passing params; %s, %s, %s, %s', LogSummary(v_int), dwMode, LogSummary(u), indent)
                     dictWalker(v_int, DictWalkerMode.dictBuild, u=u, indent=indent)
             elif dwMode.value == 'display':
                 for v_int in v:
-                    logit.debug('Recursing into dictWalker with params; {}, {}, {}'.format(v_int, str(dwMode), indent))
+                    logit.debug('Recursing into dictWalker with params; %s, %s, %s', LogSummary(v_int), dwMode, indent)
                     dictWalker(v_int, DictWalkerMode.display, indent=indent)
             dpath.pop()
         elif isinstance(v, dict):
             dpath.append(k)
             if dwMode.value == 'dictBuild':
-                logit.debug('Recursing into dictWalker passing params; {}, {}, {}, {}'.format(v, str(dwMode), u, indent))
+                logit.debug('Recursing into dictWalker passing params; %s, %s, %s, %s', LogSummary(v), dwMode, LogSummary(u), indent)
                 u.update(dictWalker(v, DictWalkerMode.dictBuild, u=u, indent=indent))
             elif dwMode.value == 'display':
                 print(indent * " ", "{} {}".format(TxtFormat.symbols.arrow_curved_down_right, k))
-                logit.debug('Recursing into dictWalker with params; {}, {}, {}'.format(v, str(dwMode), indent))
+                logit.debug('Recursing into dictWalker with params; %s, %s, %s', LogSummary(v), dwMode, indent)
                 dictWalker(v, DictWalkerMode.display, indent=indent)
             dpath.pop()
         else:
-            logit.error("Data type {} not recognized: {}.{}={}".format(type(v), ".".join(dpath), k, v))
+            logit.error("Data type %s not recognized: %s.%s=%s", type(v), ".".join(dpath), k, v)
 
     if indent == 0:
-        logit.debug("Exiting def {}".format(str(sys._getframe().f_code.co_name)))
+        logit.debug("Exiting def.")
     else:
-        logit.debug("Exiting def {}: Recursive level {}".format(str(sys._getframe().f_code.co_name), indent // 4))
+        logit.debug("Exiting def: Recursive level %s", indent // 4)
     return u
 
 
-def buildComponentSets(wb, drmJson=None, suuIso=None):
-    """Build component sets from json and web scrapes to match -wb selections."""
-    logit.debug("Entering def {}:".format(str(sys._getframe().f_code.co_name)))
-    logit.debug("Param values received: {}, {}, {}".format(wb, str(drmJson),str(suuIso)))
+def buildComponentSets(wb, drmJson=None, suuIso=None, dupSets=None):
+    """Build component sets from json, web scrapes and the enterprise catalog to match -wb selections."""
+    logit.debug("Entering def.")
+    logit.debug("Param values received: %s, %s, %s, %s", wb, LogSummary(drmJson), LogSummary(suuIso), LogSummary(dupSets))
     CSets = {}
 
     # if displayOnly with no components, reset wb to full component set from whichBits keys
@@ -496,11 +1054,14 @@ def buildComponentSets(wb, drmJson=None, suuIso=None):
                 if CSets.get('DRM Installer') is None:
                     CSets['DRM Installer'] = {}
                 CSets['DRM Installer'].update({"Linux 64 bit":drmJson['AppUpdateInfo']['LinuxInstaller']})
+            if k == 'catalog-dups' and dupSets is not None:
+                logit.info("catalog-dups requested")
+                CSets['Catalog DUPs'] = dupSets
         else:
-            logit.critical("Given there are plenty of checks in place for component selection, if you have got here then something has gone horribly wrong... whichBits option {} not recognised. Exiting,".format(k))
+            logit.critical("Given there are plenty of checks in place for component selection, if you have got here then something has gone horribly wrong... whichBits option %s not recognised. Exiting,", k)
             sys.exit(1)
-    logit.debug("Returning: {}:".format(str(CSets)))
-    logit.debug("Exiting def {}:".format(str(sys._getframe().f_code.co_name)))
+    logit.debug("Returning: %s:", LogSummary(CSets))
+    logit.debug("Exiting def.")
     return CSets
 
 
@@ -508,265 +1069,649 @@ def buildComponentSets(wb, drmJson=None, suuIso=None):
 baseURLs = ('https://downloads.dell.com','https://dl.dell.com')
 catalogURL = {
     'DRMVersion Info': 'https://downloads.dell.com/catalog/DRMVersion.tar.gz'}
+dupCatalogURL = {
+    'Dell Catalog': 'https://downloads.dell.com/catalog/Catalog.xml.gz'}
 suuWebPageURL = {
     'SUUpage': 'https://www.dell.com/support/article/en-uk/sln285500/dell-emc-server-update-utility-suu-guide-and-download?lang=en'}
 
 
-def download(urls, saveTo=None, chunkSize=8192):
-    """Download the item(s) passed in via urls paramter lst."""
+def mirrorCandidates(url):
+    """Return url followed by the same path on each alternate mirror in baseURLs."""
+    candidates = [url]
+    for base in baseURLs:
+        if url.startswith(base):
+            candidates += [url.replace(base, alt, 1) for alt in baseURLs if alt != base]
+    return candidates
 
-    logit.debug("Entering def {}:".format(str(sys._getframe().f_code.co_name)))
-    logit.debug("Param values received: {}, {}, {}".format(str(urls),saveTo,chunkSize))
-    global s
 
-    for url in urls:
-        if s.proxies:
-            logit.info('Accessing ' + urls[url] + ' via' + s.proxies.values)
-        else:
-            logit.info('Accessing ' + urls[url] + ' via direct internet connection')
+def isRetryable(err):
+    """Decide whether err is worth retrying or whether the request itself is bad."""
+    if isinstance(err, requests.exceptions.HTTPError) and err.response is not None:
+        return err.response.status_code in (407, 408, 425, 429) or err.response.status_code >= 500
+    return not isinstance(err, (requests.exceptions.InvalidURL,
+                                requests.exceptions.InvalidHeader,
+                                requests.exceptions.InvalidProxyURL,
+                                requests.exceptions.MissingSchema,
+                                requests.exceptions.InvalidSchema))
 
-        if saveTo and not os.path.exists(saveTo):
-            logit.warning("Save path specified does not exist, defaulting to current script directory.")
-            saveTo = os.path.dirname(os.path.abspath(__file__))
 
-        if saveTo:
-            fName = os.path.basename(urls[url])
-            saveAs = os.path.join(saveTo, fName)
+def isProxyFailure(err):
+    """Decide whether err points at the proxy rather than the mirror."""
+    if isinstance(err, requests.exceptions.HTTPError) and err.response is not None:
+        return err.response.status_code == 407
+    return isinstance(err, requests.exceptions.ProxyError)
 
-        i = 0
-        r = None
-        url = urls[url]
-        if saveTo and os.path.exists(saveAs):
-            logit.enforced("Skipping {}. File already exists in target directory.".format(fName))
-        else:
-            while not r and i < 2:
-                if i == 1 and 'dell.com/support' in url:
-                    logit.critical('Scrape URL source failed. Cannot continue without this. Exiting script.')
-                    sys.exit(1)
-                elif i == 1:
-                    if baseURLs[0] in url:
-                        url = url.replace(baseURLs[0], baseURLs[1])
-                    elif baseURLs[1] in url:
-                        url = url.replace(baseURLs[1], baseURLs[0])
-                    logit.warning('Switching download source after error to {}'.format(url))
-                try:  # try download, catch is for remote server errors only, not early download termination due to issues script side.
-                    if i == 1:
-                        logit.info('Original URL failed, trying alternate URL {}'.format(url))
-                    logit.info('Making Header request to URL {} for availability and content size.'.format(url))
-                    r = s.get(url, stream=True).headers
-                    expectedLength = int(r['Content-Length'])  # .headers.get('content-length')
-                    logit.info("Expected Content Download Size: " + str(expectedLength))
-                    with s.get(url, stream=True, timeout=60) as r:
-                        if saveTo and saveAs is not None:
-                            tmpFileName = saveAs+'.downloading'
-                            with open(tmpFileName, 'wb') as f:
-                                logit.info("Created placeholder download file: {}".format(saveAs+'.downloading'))
-                                for chunk in r.iter_content(chunk_size=chunkSize):
-                                    if chunk:
-                                        f.write(chunk)
-                                    # receivedChunkSize = len(chunk)
-                                    receivedLength = r.raw.tell()
-                                    remainingBytes = expectedLength - receivedLength
-                                    pctComplete = 100 / expectedLength * receivedLength
-                                    if remainingBytes > 0 :
-                                        print("\rDownloading {} : Downloaded {:0>6.2f}% : Bytes remaining {:0>11}".format(fName,pctComplete,remainingBytes),end='')
-                                    else:
-                                        print("\rDownloading {} : Downloaded {:0>6.2f}% : Bytes remaining {:0>11}".format(fName,pctComplete,remainingBytes))
-                            if receivedLength < expectedLength:
-                                print('')
-                                logit.error('{} download incomplete. Received {} bytes, expected {}, missing {}.'.format(fName, receivedLength, expectedLength, expectedLength - receivedLength))
-                                logit.debug('Last http status before failure was: {}'.format(r.status_code))
-                                r.raise_for_status()
-                                raise DownloadFailedWithoutStatusCode()
-                            else:
-                                logit.success('{} downloaded.'.format(fName))
-                                try:
-                                    os.rename(tmpFileName, saveAs)
-                                except IOError as err:
-                                    logit.error('Could not rename {} to {}'.format(tmpFileName,saveAs)) # should be picked up by IOError
-                                    logit.error(repr(err))
-                                except:
-                                    logit.error(repr(err))
-                        else:
-                            logit.success('Content retreived to RAM.')
-                            logit.debug("Exiting def {}:".format(str(sys._getframe().f_code.co_name)))
-                            return r.content
-                except (requests.exceptions.HTTPError,
-                        requests.exceptions.ConnectionError,
-                        requests.exceptions.Timeout,
-                        requests.exceptions.RequestException,
-                        requests.exceptions.ChunkedEncodingError,
-                        requests.exceptions.ContentDecodingError,
-                        requests.exceptions.ProxyError,
-                        requests.exceptions.SSLError,
-                        requests.exceptions.InvalidURL,
-                        requests.exceptions.InvalidHeader,
-                        requests.exceptions.InvalidProxyURL,
-                        requests.exceptions.RetryError,
-                        IOError,
-                        EnvironmentError,
-                        DownloadFailedWithoutStatusCode) as err:
-                    print('')
-                    logit.error(repr(err))
-                    i =+ 1
-                    r = None
-                except KeyboardInterrupt:
-                    print('')
-                    logit.critical("Keyboard Interrupt by user. Exiting script.")
-                    sys.exit(1)
-                except:
-                    print('')
-                    logit.error(traceback.print_exc())
-                    i =+ 1
-                    r=None
-            if i == 2:
-                #Move on to next file. Not hard exit since we may still get the rest.
-                logit.error('All URL sources failed for {}'.format(url))
-                logit.debug("Exiting def {}:".format(str(sys._getframe().f_code.co_name)))
+
+def fetchWithRetry(url, transfer, artifact=None, kind='file', progress=False):
+    """
+    Request url with the retry policy, mirror circuit breaker and proxy pool applied.
+
+    transfer(r, url) consumes the open streaming response and returns a
+    tuple of (result, bytes received). Any exception raised while requesting
+    or transferring counts as a failed attempt. kind is passed on to the run
+    metrics. progress says transfer draws a progress line, which is ended
+    before logging an error. Returns the transfer result, or raises
+    DownloadSourcesExhausted once attempts or mirrors run out.
+    """
+    logit.debug("Entering def.")
+    logit.debug("Param values received: %s, %s, %s, %s, %s", url, transfer, artifact, kind, progress)
+    global proxyPool
+    global metrics
+    global retryPolicy
+    global breaker
+
+    candidates = mirrorCandidates(url)
+    target = None
+    # only moves on mirror failures, so a failing proxy does not switch mirror
+    rotation = 0
+    for attempt in range(retryPolicy.attempts):
+        if downloadCancelled.is_set():
+            raise DownloadCancelled()
+        if not candidates:
+            break
+        previous = target
+        target = breaker.pick(candidates, rotation)
+        if previous and target != previous:
+            metrics.recordFallback(previous)
+            logit.warning('Switching download source after error to %s', target)
+        host = urlparse(target).netloc
+        retryAfter = None
+        entry = proxyPool.acquire()
+        expectedLength = 0
+        try:
+            logit.info('Requesting %s via %s (attempt %s of %s)', target, proxyPool.label(entry), attempt + 1, retryPolicy.attempts)
+            started = monotonic()
+            with entry['session'].get(target, stream=True, timeout=60) as r:
+                ttfb = monotonic() - started
+                r.raise_for_status()
+                expectedLength = int(r.headers.get('Content-Length') or 0)
+                proxyPool.expect(entry, expectedLength)
+                result, receivedLength = transfer(r, target)
+            seconds = monotonic() - started
+            proxyPool.release(entry, expectedLength, receivedLength)
+            breaker.success(host)
+            metrics.recordFetched(artifact or target, target, receivedLength, seconds, ttfb, kind)
+            logit.debug("Exiting def.")
+            return result
+        except KeyboardInterrupt:
+            if progress:
+                print('')
+            logit.critical("Keyboard Interrupt by user. Exiting script.")
+            sys.exit(1)
+        except DownloadCancelled:
+            proxyPool.release(entry, expectedLength, cancelled=True)
+            breaker.abandon(host)
+            raise
+        except Exception as err:
+            if progress:
+                print('')
+            if isinstance(err, (requests.RequestException, IOError)):
+                logit.error('%r', err)
+            else:
+                logit.error(traceback.format_exc())
+            # a proxy failure is not the mirror's fault, it is recorded against the proxy and
+            # the pool's own breaker takes it. The next attempt stays on the same mirror.
+            proxyFailure = isProxyFailure(err)
+            proxyPool.release(entry, expectedLength, failed=proxyFailure)
+            if proxyFailure:
+                metrics.recordProxyFailure(proxyPool.label(entry))
+                breaker.abandon(host)
+                logit.warning('Proxy %s failed, next attempt goes through the pool again.', proxyPool.label(entry))
+            elif isRetryable(err):
+                metrics.recordRetry(target)
+                breaker.failure(host)
+                rotation += 1
+                if isinstance(err, requests.exceptions.HTTPError) and err.response is not None:
+                    retryAfter = RetryPolicy.parseRetryAfter(err.response.headers.get('Retry-After'))
+            else:
+                # the request itself is bad for this mirror, no point asking it again
+                metrics.recordRetry(target)
+                breaker.abandon(host)
+                candidates.remove(target)
+                continue
+        if attempt + 1 < retryPolicy.attempts and candidates:
+            delay = retryPolicy.delay(attempt, retryAfter)
+            logit.warning('Retrying in %.1f seconds.', delay)
+            # wakes straight away on cancellation, the top of the loop then raises
+            downloadCancelled.wait(delay)
+    logit.debug("Exiting def.")
+    raise DownloadSourcesExhausted('All URL sources failed for {}'.format(url))
+
+
+def saveStream(r, fName, saveAs, chunkSize=8192, progress=True):
+    """Stream response r to saveAs via a .downloading placeholder file. Returns (saveAs, bytes received)."""
+    expectedLength = r.headers.get('Content-Length')
+    expectedLength = int(expectedLength) if expectedLength else None
+    logit.info("Expected Content Download Size: %s", expectedLength)
+    receivedLength = 0
+    tmpFileName = saveAs+'.downloading'
+    with open(tmpFileName, 'wb') as f:
+        logit.info("Created placeholder download file: %s", tmpFileName)
+        for chunk in r.iter_content(chunk_size=chunkSize):
+            if downloadCancelled.is_set():
+                # set from the main thread when the user cancels
+                raise DownloadCancelled()
+            if chunk:
+                f.write(chunk)
+            receivedLength = r.raw.tell()
+            if expectedLength and progress:
+                remainingBytes = expectedLength - receivedLength
+                pctComplete = 100 / expectedLength * receivedLength
+                if remainingBytes > 0 :
+                    print("\rDownloading {} : Downloaded {:0>6.2f}% : Bytes remaining {:0>11}".format(fName,pctComplete,remainingBytes),end='')
+                else:
+                    print("\rDownloading {} : Downloaded {:0>6.2f}% : Bytes remaining {:0>11}".format(fName,pctComplete,remainingBytes))
+    if expectedLength and receivedLength < expectedLength:
+        if progress:
+            print('')
+        logit.error('%s download incomplete. Received %s bytes, expected %s, missing %s.', fName, receivedLength, expectedLength, expectedLength - receivedLength)
+        logit.debug('Last http status before failure was: %s', r.status_code)
+        raise DownloadFailedWithoutStatusCode()
+    logit.success('%s downloaded.', fName)
+    try:
+        os.rename(tmpFileName, saveAs)
+    except IOError as err:
+        logit.error('Could not rename %s to %s', tmpFileName, saveAs)
+        logit.error('%r', err)
+    return saveAs, receivedLength
+
+
+def downloadFile(url, fName, saveAs, chunkSize=8192, progress=True):
+    """Download a single file to saveAs, indexing it afterwards if it is an ISO."""
+    global metrics
+    try:
+        fetchWithRetry(url, lambda r, u: saveStream(r, fName, saveAs, chunkSize, progress), fName, progress=progress)
+    except DownloadSourcesExhausted as err:
+        #Move on to next file. Not hard exit since we may still get the rest.
+        logit.error(str(err))
+        metrics.recordFailed(fName)
+        return
+    except DownloadCancelled:
+        # quiet exit, the main thread reports the cancellation
+        logit.debug("%s cancelled.", fName)
+        return
+    if fName.lower().endswith('.iso') and os.path.exists(saveAs):
+        indexIso(saveAs)
+
+
+def download(urls, saveTo=None, chunkSize=8192):
+    """Download the item(s) passed in via urls paramter lst."""
+
+    logit.debug("Entering def.")
+    logit.debug("Param values received: %s, %s, %s", LogSummary(urls), saveTo, chunkSize)
+    global metrics
+    global downloadThreads
+
+    if saveTo and not os.path.exists(saveTo):
+        logit.warning("Save path specified does not exist, defaulting to current script directory.")
+        saveTo = os.path.dirname(os.path.abspath(__file__))
+
+    jobs = []
+    for key in urls:
+        url = urls[key]
+        if not saveTo:
+            content = fetchWithRetry(url, lambda r, u: (r.content, len(r.content)), key, 'discovery')
+            logit.success('Content retreived to RAM.')
+            logit.debug("Exiting def.")
+            return content
+
+        fName = os.path.basename(url)
+        saveAs = os.path.join(saveTo, fName)
+        if os.path.exists(saveAs):
+            logit.enforced("Skipping %s. File already exists in target directory.", fName)
+            metrics.recordSkipped(fName)
+            continue
+        jobs.append((url, fName, saveAs))
+
+    if downloadThreads > 1 and len(jobs) > 1:
+        # per file progress lines would overwrite each other, completion is logged instead
+        logit.info("Downloading %s files, %s at a time.", len(jobs), downloadThreads)
+        executor = ThreadPoolExecutor(max_workers=downloadThreads)
+        futures = [executor.submit(downloadFile, url, fName, saveAs, chunkSize, False) for url, fName, saveAs in jobs]
+        try:
+            for f in as_completed(futures):
+                f.result()
+        except KeyboardInterrupt:
+            downloadCancelled.set()
+            for f in futures:
+                f.cancel()
+            executor.shutdown(wait=False)
+            raise
+        executor.shutdown()
+    else:
+        for url, fName, saveAs in jobs:
+            downloadFile(url, fName, saveAs, chunkSize)
+    logit.debug("Exiting def.")
+
+
+def downloadRequired(urls):
+    """download() to RAM for sources the script cannot continue without, e.g. catalogs and scrape pages."""
+    try:
+        return download(urls)
+    except DownloadSourcesExhausted as err:
+        metrics.recordFailed(next(iter(urls)))
+        logit.critical('%s. Cannot continue without this. Exiting script.', err)
+        sys.exit(1)
+
+
+def catalogComponentMatches(elem, models=None, osCodes=None, componentTypes=None):
+    """Check a catalog SoftwareComponent element against the model, OS and component type filters."""
+    if componentTypes:
+        ct = elem.find('ComponentType')
+        if ct is None or (ct.get('value') or '').upper() not in componentTypes:
+            return False
+    if osCodes:
+        if not {(o.get('osCode') or '').upper() for o in elem.iterfind('SupportedOperatingSystems/OperatingSystem')} & osCodes:
+            return False
+    if models:
+        ids = set()
+        for m in elem.iterfind('SupportedSystems/Brand/Model'):
+            ids.add((m.get('systemID') or '').upper())
+            ids.add((m.findtext('Display') or '').strip().upper())
+        if not ids & models:
+            return False
+    return True
+
+
+def streamCatalogComponents(url, models=None, osCodes=None, componentTypes=None):
+    """
+    Stream Dell's gzipped enterprise catalog and return the SoftwareComponents matching the filters.
+
+    The response is decompressed and parsed with lxml iterparse as it arrives.
+    Each top level element is cleared once seen so peak memory does not grow
+    with the catalog. Returns {component name: {file name: url}} ready for
+    buildComponentSets().
+    """
+    logit.debug("Entering def.")
+    logit.debug("Param values received: %s, %s, %s, %s", url, models, osCodes, componentTypes)
+    models = {m.upper() for m in models} if models else None
+    osCodes = {o.upper() for o in osCodes} if osCodes else None
+    componentTypes = {c.upper() for c in componentTypes} if componentTypes else None
+
+    def transfer(r, u):
+        # started fresh on every attempt so a retried stream never double counts
+        matches = {}
+        seen = 0
+        root = None
+        baseLocation = None
+        with gzip.GzipFile(fileobj=r.raw) as gz:
+            for event, elem in etree.iterparse(gz, events=('start', 'end'), huge_tree=True):
+                if event == 'start':
+                    if root is None:
+                        root = elem
+                        baseLocation = elem.get('baseLocation') or urlparse(baseURLs[0]).netloc
+                    continue
+                if elem.getparent() is not root:
+                    continue
+                if etree.QName(elem).localname == 'SoftwareComponent':
+                    seen += 1
+                    if catalogComponentMatches(elem, models, osCodes, componentTypes):
+                        name = (elem.findtext('Name/Display') or elem.get('packageID') or '').strip()
+                        path = elem.get('path')
+                        if path:
+                            matches.setdefault(name, {})[os.path.basename(path)] = "https://"+baseLocation+"/"+path.replace('\\', '/')
+                # drop what we have finished with, including the already processed siblings held by root
+                elem.clear()
+                while elem.getprevious() is not None:
+                    del root[0]
+        logit.info("Catalog SoftwareComponents scanned: %s, matched: %s", seen, sum(len(v) for v in matches.values()))
+        return matches, r.raw.tell()
+
+    matches = fetchWithRetry(url, transfer, os.path.basename(url), 'discovery')
+    logit.debug("Returning: %s:", LogSummary(matches))
+    logit.debug("Exiting def.")
+    return matches
 
 
 def extractJsonFromGzip(gzdata):
     """Extract gzip file to memory for json data retreival."""
-    logit.debug("Entering def {}:".format(str(sys._getframe().f_code.co_name)))
-    logit.debug("Param value received: {}".format(gzdata))
+    logit.debug("Entering def.")
+    logit.debug("Param value received: %s", LogSummary(gzdata))
     with tarfile.open(fileobj=BytesIO(gzdata), mode='r:gz') as t:
         logit.debug('Extracting gz')
         f = t.getmember('DRMVersion.json')
-        logit.debug("Got {} from extracted gz".format(f.name))
+        logit.debug("Got %s from extracted gz", f.name)
         j = loads(t.extractfile(f).read().decode('utf-8'))
-        logit.debug('Extracted info: {}'.format(j))
+        logit.debug('Extracted info: %s', LogSummary(j))
         t.close()
-        logit.debug("Returning var j from def {}:".format(str(sys._getframe().f_code.co_name)))
+        logit.debug("Returning var j.")
         return j
 
 
-def globalProxySessionSetup(proxy=None, proxyuser=None):
-    """Create global proxy setup and return any necessary session keys if required."""
-    logit.debug("Entering def {}:".format(str(sys._getframe().f_code.co_name)))
-    logit.debug("Param values received: {}, {}".format(proxy, proxyuser))
-    global proxylist
-    global proxypass
-    global s
-    s = requests.Session()
-    if proxy:
-        proxylist = {
-            "http": "http://"+args.pa,
-            "https": "https://"+args.pa
-        }
-        s.proxies = proxylist
-        logit.debug('Proxy List: {}'.format(s.proxies))
-    if proxyuser:
-        proxypass = getpass.getpass("Enter Proxy Password")
-    if proxy and proxyuser and proxypass:
-        auth = requests.auth.HTTPProxyAuth(proxyuser, proxypass)
-        s.auth = auth
-        logit.debug('Received Proxy Credentials')
-    logit.debug("Exiting def {}:".format(str(sys._getframe().f_code.co_name)))
+class IsoIndexer():
+    """
+    Read only ISO9660/Joliet reader working directly on a mmap of the image.
+
+    Walks the directory records from the Joliet supplementary volume
+    descriptor when present (full length unicode names), otherwise the
+    primary volume descriptor. Nothing is mounted and the image is never
+    copied, extract() writes straight from the mapped file extent.
+    """
+
+    SECTOR = 2048
+    JOLIET_ESCAPES = (b'%/@', b'%/C', b'%/E')
+
+    def __init__(self, path):
+        """__init__ of the image path."""
+        self.name = 'isoIndexer'
+        self.path = path
+        self.f = None
+        self.mm = None
+
+    def __enter__(self):
+        """__enter__ maps the image read only and locates the root directory record."""
+        self.f = open(self.path, 'rb')
+        try:
+            self.mm = mmap.mmap(self.f.fileno(), 0, access=mmap.ACCESS_READ)
+            self.root, self.joliet, self.volumeId = self.readVolumeDescriptors()
+        except Exception:
+            self.__exit__(None, None, None)
+            raise
+        return self
+
+    def __exit__(self, et, ev, tb):
+        """__exit__ releases the map and file."""
+        if self.mm is not None:
+            self.mm.close()
+            self.mm = None
+        if self.f is not None:
+            self.f.close()
+            self.f = None
+        # implicit return of None => don't swallow exceptions
+
+    def readVolumeDescriptors(self):
+        """Return (root directory record offset, joliet flag, volume id) from the volume descriptor set."""
+        primary = joliet = None
+        sector = 16
+        while (sector + 1) * self.SECTOR <= len(self.mm):
+            vd = sector * self.SECTOR
+            vdType = self.mm[vd]
+            if self.mm[vd+1:vd+6] != b'CD001':
+                raise IsoFormatError('{} is not an ISO9660 image, no volume descriptor at sector {}.'.format(self.path, sector))
+            if vdType == 255:
+                break
+            if vdType == 1 and primary is None:
+                primary = vd
+            elif vdType == 2 and self.mm[vd+88:vd+91] in self.JOLIET_ESCAPES:
+                joliet = vd
+            sector += 1
+        if primary is None:
+            raise IsoFormatError('{} has no primary volume descriptor.'.format(self.path))
+        volumeId = self.mm[primary+40:primary+72].decode('ascii', 'replace').strip()
+        vd = joliet if joliet is not None else primary
+        # root directory record is embedded in the volume descriptor at offset 156
+        return vd + 156, joliet is not None, volumeId
+
+    def record(self, offset):
+        """Decode the directory record at offset into (name, lba, size, isDir)."""
+        lba, size = struct.unpack_from('<I4xI', self.mm, offset + 2)
+        flags = self.mm[offset + 25]
+        nameLen = self.mm[offset + 32]
+        rawName = self.mm[offset + 33:offset + 33 + nameLen]
+        if rawName in (b'\x00', b'\x01'):
+            name = None
+        elif self.joliet:
+            name = rawName.decode('utf-16-be', 'replace')
+        else:
+            name = rawName.decode('ascii', 'replace')
+        if name and not flags & 2:
+            name = name.split(';')[0]
+            if name.endswith('.'):
+                name = name[:-1]
+        return name, lba, size, bool(flags & 2)
+
+    def walk(self):
+        """Yield (path, size, offset) for every file in the image."""
+        name, lba, size, isDir = self.record(self.root)
+        pending = [('', lba, size)]
+        seen = set()
+        while pending:
+            parent, lba, size = pending.pop()
+            if lba in seen:
+                continue
+            seen.add(lba)
+            start = lba * self.SECTOR
+            end = min(start + size, len(self.mm))
+            offset = start
+            while offset < end:
+                recLen = self.mm[offset]
+                if recLen == 0:
+                    # records never span sectors, zero padding means move on to the next sector
+                    offset = (offset // self.SECTOR + 1) * self.SECTOR
+                    continue
+                name, childLba, childSize, childIsDir = self.record(offset)
+                offset += recLen
+                if name is None:
+                    continue
+                path = parent + '/' + name if parent else name
+                if childIsDir:
+                    pending.append((path, childLba, childSize))
+                else:
+                    yield path, childSize, childLba * self.SECTOR
+
+    def index(self):
+        """Return the contents of the image as a list of {'path', 'size', 'offset'} dicts sorted by path."""
+        return sorted(({'path': p, 'size': s, 'offset': o} for p, s, o in self.walk()), key=lambda e: e['path'])
+
+    @staticmethod
+    def findCatalog(entries):
+        """Return the repository catalog entry from an index, preferring the shallowest match."""
+        catalogs = [e for e in entries if os.path.basename(e['path']).lower() in ('catalog.xml', 'catalog.xml.gz')]
+        return min(catalogs, key=lambda e: (e['path'].count('/'), e['path'])) if catalogs else None
+
+    def extract(self, entry, saveAs):
+        """Write the file for index entry to saveAs straight from the mapped image."""
+        if entry['offset'] + entry['size'] > len(self.mm):
+            raise IsoFormatError('{} extends beyond the end of {}.'.format(entry['path'], self.path))
+        tmpFileName = saveAs+'.tmp'
+        with memoryview(self.mm) as view, open(tmpFileName, 'wb') as f:
+            f.write(view[entry['offset']:entry['offset'] + entry['size']])
+        os.replace(tmpFileName, saveAs)
+
+
+def indexIso(isoPath):
+    """
+    Index a downloaded ISO without mounting it.
+
+    Writes <iso>.index.json listing the path, size and offset of every file in
+    the image and extracts the embedded repository catalog next to the ISO.
+    Failures are logged rather than raised so a bad image does not stop the run.
+    """
+    logit.debug("Entering def.")
+    logit.debug("Param value received: %s", isoPath)
+    try:
+        with IsoIndexer(isoPath) as iso:
+            entries = iso.index()
+            catalog = iso.findCatalog(entries)
+            indexPath = isoPath+'.index.json'
+            with open(indexPath+'.tmp', 'w') as f:
+                f.write(dumps({'iso': os.path.basename(isoPath),
+                               'volumeId': iso.volumeId,
+                               'joliet': iso.joliet,
+                               'catalog': catalog['path'] if catalog else None,
+                               'components': entries}, indent=4))
+            os.replace(indexPath+'.tmp', indexPath)
+            logit.success('Indexed %s files in %s to %s', len(entries), os.path.basename(isoPath), indexPath)
+            if catalog:
+                catalogPath = os.path.splitext(isoPath)[0]+'_'+os.path.basename(catalog['path'])
+                iso.extract(catalog, catalogPath)
+                logit.success('Extracted %s from %s to %s', catalog['path'], os.path.basename(isoPath), catalogPath)
+            else:
+                logit.warning('No repository catalog found in %s', os.path.basename(isoPath))
+    except (IOError, OSError, ValueError, struct.error, IsoFormatError) as err:
+        logit.error('Could not index %s', isoPath)
+        logit.error('%r', err)
+    logit.debug("Exiting def.")
+
+
+def globalProxySessionSetup(proxies=None, proxyusers=None, poolSize=10):
+    """Create the global proxy pool, one pooled session per proxy, prompting for each proxy password if required."""
+    logit.debug("Entering def.")
+    logit.debug("Param values received: %s, %s, %s", proxies, proxyusers, poolSize)
+    global proxyPool
+    proxyPool = ProxyPool(MirrorCircuitBreaker(args.cb, args.cc, kind='proxy'))
+    proxyusers = proxyusers or []
+    for idx, proxy in enumerate(proxies or [None]):
+        s = requests.Session()
+        adapter = requests.adapters.HTTPAdapter(pool_connections=poolSize, pool_maxsize=poolSize)
+        s.mount('http://', adapter)
+        s.mount('https://', adapter)
+        if proxy:
+            s.proxies = {
+                "http": "http://"+proxy,
+                "https": "https://"+proxy
+            }
+            logit.debug('Proxy List: %s', s.proxies)
+            proxyuser = proxyusers[idx] if len(proxyusers) > 1 else (proxyusers[0] if proxyusers else None)
+            if proxyuser:
+                proxypass = getpass.getpass("Enter Proxy Password for {} at {}: ".format(proxyuser, proxy))
+                if proxypass:
+                    s.auth = requests.auth.HTTPProxyAuth(proxyuser, proxypass)
+                    logit.debug('Received Proxy Credentials for %s', proxy)
+        proxyPool.add(proxy, s)
+    logit.debug("Exiting def.")
 
 
 # main
 if __name__ == "__main__":
     '''main code block'''
     logit.debug("Starting main code block.")
+    if args.ix:
+        for iso in args.ix:
+            indexIso(iso)
+        logit.enforced("End of Script.")
+        sys.exit(0)
+
     # Define some global level vars, yes I know global vars are also a smell.....
-    s = None
-    proxylist = {}
-    proxypass = None
+    proxyPool = None
+    downloadThreads = max(1, args.dt or len(args.pa or []))
     dpath = []
+    jsonCatalog = None
+    suuLinkMap = None
+    dupSets = None
+    metrics = RunMetrics()
+    retryPolicy = RetryPolicy(args.ra, args.rb, args.rx)
+    breaker = MirrorCircuitBreaker(args.cb, args.cc)
+    if args.mf:
+        # registered with atexit so runs that end via sys.exit() still report their failures
+        atexit.register(metrics.write, args.mf)
 
     # Check for Python version relese info and report as enforced, just in case.
     if float(sys.version[:3]) < 3.7:
         logit.warning("This script has not been tested on below Python 3.7")
 
-    if args.pa: logit.info("Proxy Address Specified: " + args.pa)
-    if args.pu: logit.info("Proxy User Specified: "  + args.pa)
+    if args.pa: logit.info("Proxy Address Specified: %s", ", ".join(args.pa))
+    if args.pu: logit.info("Proxy User Specified: %s", ", ".join(args.pu))
 
     # Log Debug Info Messages regarding paramters selected
     if args.l:
-        logit.info("Logging to file {}".format(logitFileName))
+        logit.info("Logging to file %s", logitFileName)
 
     if args.wb != 'display-Only':
-        logit.info("Save location set to:"+args.dp)
+        logit.info("Save location set to:%s", args.dp)
 
     if 'display-Only' in args:
-        logit.info("Getting URLs for items requested: "+",".join(map(str, args.wb)))
+        logit.info("Getting URLs for items requested: %s", ",".join(map(str, args.wb)))
     else:
-        logit.info("Download Selected Components for items requested: "+",".join(map(str, args.wb)))
+        logit.info("Download Selected Components for items requested: %s", ",".join(map(str, args.wb)))
 
     # run this even if no proxy, we are doing this because we are using Requests sessions
     # this allows us to keep the requetss all going through the same code base rather than
     # implement an alternate approach in the same code.
-    globalProxySessionSetup(args.pa, args.pu)
+    globalProxySessionSetup(args.pa, args.pu, max(10, downloadThreads))
 
     # check for string partial match or args.wb only having displayOnly and no other value
     if [a for a in args.wb if a.startswith('drm') or a.startswith('plug')] or (len(args.wb) == 1 and 'displayOnly' in args.wb):
-        jsonCatalog = extractJsonFromGzip(download(catalogURL))
+        with metrics.timed('catalog'):
+            jsonCatalog = extractJsonFromGzip(downloadRequired(catalogURL))
 
     if [a for a in args.wb if a.startswith('suu')] or (len(args.wb) == 1 and 'displayOnly' in args.wb) :
-        #Download SUU Landing Page HTML
-        suupage=download(suuWebPageURL)
-
-        ###get SUU landing page###
-        html = BeautifulSoup(suupage,'lxml')
-        targetTable = html.select('table.table.table-striped.table-bordered') #target table
-        soupTable = BeautifulSoup(str(targetTable), 'lxml')
-        thead = soupTable.find('thead')
-        colIdx={}
-        for htr in thead.findAll('tr'):
-            th=htr.findAll('th')
-            for td in th:
-                colIdx[td.text.strip()] = th.index(td)
-        logit.debug("colIdx: "+str(colIdx))
-
-        suuLinkMap={}
-        tbody = soupTable.find('tbody')
-        for btr in tbody.findAll('tr'):
-            cells=btr.findAll('td')
-            o_s=cells[colIdx['Operating System']].text.strip()
-            suuLinkMap[o_s] = {}
-            for ci in colIdx:
-                if ci == 'Operating System':
-                    pass
-                elif ci == 'Download Link' or ci =='Documentation':
-                    suuLinkMap[o_s].update({ci:cells[colIdx[ci]].find('a').get('href')})
-                else:
-                    suuLinkMap[o_s].update({ci:cells[colIdx[ci]].text.strip()})
-
-        logit.debug("suuLinkMap: "+str(suuLinkMap))
-        ### end suu landing page ###
+        with metrics.timed('suu'):
+            #Download SUU Landing Page HTML
+            suupage=downloadRequired(suuWebPageURL)
 
-        ### Get SUU ISO Page Links based on args in SUU type
-        # Get landing page links
-        for link in suuLinkMap:
-            logit.info("Link extracted "+suuLinkMap[link]['Download Link'])
-            suuLinkMap[link]['Download Link'] = download({link:suuLinkMap[link]['Download Link']})
-
-        # Follow landing page links to get ISO links
-        for link in suuLinkMap:
-            html = BeautifulSoup(suuLinkMap[link]['Download Link'],'lxml')
-            targetTable = html.select('div.my-5:nth-child(1) > div:nth-child(5) > div:nth-child(2) > div:nth-child(1) > div:nth-child(2) > a:nth-child(1)') #target table
+            ###get SUU landing page###
+            html = BeautifulSoup(suupage,'lxml')
+            targetTable = html.select('table.table.table-striped.table-bordered') #target table
             soupTable = BeautifulSoup(str(targetTable), 'lxml')
-            logit.info("Found ISO URL: "+soupTable.find('a').get('href'))
-            suuLinkMap[link]['Download Link'] = soupTable.find('a').get('href')
-        ### End Get SUU ISO Links
-
-    if len(args.wb) == 1 and 'displayOnly' in args.wb:
-        # no params specified so get all
-        cSets = buildComponentSets(args.wb, jsonCatalog, suuLinkMap)
-    elif (any('drm' or 'plug' in a for a in args.wb) and (all('suu' not in a for a in args.wb))):
-        # if has drm or plugins specified but not suu
-        cSets = buildComponentSets(args.wb, drmJson=jsonCatalog)
-    elif (any('drm' or 'plug' not in a for a in args.wb) and (all('suu' in a for a in args.wb))):
-        # if only has suu specified
-        cSets = buildComponentSets(args.wb, suuIso=suuLinkMap)
-    else:
-        # fallback get all
-        cSets = buildComponentSets(args.wb, jsonCatalog, suuLinkMap)
+            thead = soupTable.find('thead')
+            colIdx={}
+            for htr in thead.findAll('tr'):
+                th=htr.findAll('th')
+                for td in th:
+                    colIdx[td.text.strip()] = th.index(td)
+            logit.debug("colIdx: %s", colIdx)
+
+            suuLinkMap={}
+            tbody = soupTable.find('tbody')
+            for btr in tbody.findAll('tr'):
+                cells=btr.findAll('td')
+                o_s=cells[colIdx['Operating System']].text.strip()
+                suuLinkMap[o_s] = {}
+                for ci in colIdx:
+                    if ci == 'Operating System':
+                        pass
+                    elif ci == 'Download Link' or ci =='Documentation':
+                        suuLinkMap[o_s].update({ci:cells[colIdx[ci]].find('a').get('href')})
+                    else:
+                        suuLinkMap[o_s].update({ci:cells[colIdx[ci]].text.strip()})
+
+            logit.debug("suuLinkMap: %s", LogSummary(suuLinkMap))
+            ### end suu landing page ###
+
+            ### Get SUU ISO Page Links based on args in SUU type
+            # Get landing page links
+            for link in suuLinkMap:
+                logit.info("Link extracted %s", suuLinkMap[link]['Download Link'])
+                suuLinkMap[link]['Download Link'] = downloadRequired({link:suuLinkMap[link]['Download Link']})
+
+            # Follow landing page links to get ISO links
+            for link in suuLinkMap:
+                html = BeautifulSoup(suuLinkMap[link]['Download Link'],'lxml')
+                targetTable = html.select('div.my-5:nth-child(1) > div:nth-child(5) > div:nth-child(2) > div:nth-child(1) > div:nth-child(2) > a:nth-child(1)') #target table
+                soupTable = BeautifulSoup(str(targetTable), 'lxml')
+                logit.info("Found ISO URL: %s", soupTable.find('a').get('href'))
+                suuLinkMap[link]['Download Link'] = soupTable.find('a').get('href')
+            ### End Get SUU ISO Links
+
+    # enterprise catalog only when asked for, or with displayOnly on its own if a model filter was given
+    if 'catalog-dups' in args.wb or (len(args.wb) == 1 and 'displayOnly' in args.wb and args.sm):
+        with metrics.timed('dup-catalog'):
+            try:
+                dupSets = streamCatalogComponents(dupCatalogURL['Dell Catalog'], args.sm, args.os, args.ct)
+            except DownloadSourcesExhausted as err:
+                # the other components can still be fetched without it, but the run has not succeeded
+                metrics.recordFailed(os.path.basename(dupCatalogURL['Dell Catalog']))
+                logit.error('%s. Skipping catalog-dups.', err)
+
+    # anything not fetched above is still None and is left out of the component sets
+    cSets = buildComponentSets(args.wb, jsonCatalog, suuLinkMap, dupSets)
 
     #downloads = dictWalker(cSets)
     if 'displayOnly' in args.wb:
         #dictWalker2(cSets) # print to screen
         dictWalker(cSets, DictWalkerMode.display)
+        metrics.recordCompleted()
     else:
         logit.debug('Collated Components to Download')
         #logit.debug(dictWalker2(cSets))
@@ -778,6 +1723,7 @@ if __name__ == "__main__":
             #download(downloads, args.dp)
             #download(dictWalker(cSets), args.dp)
             download(dictWalker(cSets, DictWalkerMode.dictBuild), args.dp)
+            metrics.recordCompleted()
         except KeyboardInterrupt:
             logit.critical('User Cancelled Operations. Exiting.')
             sys.stderr = open(os.devnull, 'w')